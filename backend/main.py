@@ -8,39 +8,258 @@ answers.  It also demonstrates how to optionally integrate an external LLM
 service (e.g. OpenAI) for follow‑up logic.
 """
 
+import asyncio
+import functools
+import hashlib
 import json
+import mmap
 import os
-from typing import List, Dict, Any
+import re
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, FrozenSet, Iterable, Iterator, Optional, Sequence, Tuple, Union
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Body
-from fastapi.responses import JSONResponse
+import numpy as np
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Body, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
-from .schemas import Question, ScanResult, RecommendRequest
+from .schemas import ScanResult, RecommendRequest
 
 try:
     import cv2  # type: ignore
 except ImportError:
     cv2 = None  # OpenCV is optional; scanning logic will fall back to dummy
 
+try:
+    # Optional: libjpeg-turbo bindings for faster JPEG decoding. Needs the
+    # native libturbojpeg library, so it is not listed in requirements.txt.
+    from turbojpeg import TurboJPEG, TJPF_GRAY, TJFLAG_FASTDCT  # type: ignore
+    _turbojpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    _turbojpeg = None
+
+_JPEG_MAGIC = b"\xff\xd8"
+
+try:
+    # Optional: batched nvJPEG decoding on CUDA GPUs via torchvision
+    import torch  # type: ignore
+    from torchvision.io import ImageReadMode, decode_jpeg  # type: ignore
+except ImportError:
+    torch = None
+
+try:
+    # Optional: JIT-compiles the product scoring kernel
+    from numba import njit  # type: ignore
+except ImportError:
+    njit = None
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None  # Fall back to the (slower) stdlib json parser
+
 try:
     import openai  # Optional: used to demonstrate LLM‑powered follow‑up logic
 except ImportError:
     openai = None
 
 
+class LazyProducts(Sequence):
+    """Read‑only product sequence that decodes records from a memory map on access.
+
+    Only the byte span of each product is kept in memory; the full dictionary
+    is parsed when indexed, so large catalogues don't hold every product as a
+    Python object tree.
+    """
+
+    def __init__(self, buffer: mmap.mmap, spans: List[Tuple[int, int]]) -> None:
+        self._buffer = buffer
+        self._spans = spans
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __getitem__(self, index):  # type: ignore[override]
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        start, end = self._spans[index]
+        return _json_loads(self._buffer[start:end])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for start, end in self._spans:
+            yield _json_loads(self._buffer[start:end])
+
+
+class Catalogue:
+    """Parsed product catalogue together with precomputed scoring data.
+
+    Attributes:
+        products: Product dictionaries in file order, either a tuple or a
+            `LazyProducts` sequence for very large catalogues.
+        mtime_ns: Modification time of the source file, if loaded from disk.
+        tag_index: Maps every concern tag in the catalogue to a bit position.
+        bits: ``uint64`` array of shape ``(len(products), words)`` where bit
+            ``k % 64`` of word ``k // 64`` is set when a product carries the tag
+            at position ``k``. Scoring is a popcount of each row ANDed with the
+            query mask, 64 tags per word.
+    """
+
+    def __init__(
+        self,
+        products: Sequence[Dict[str, Any]],
+        mtime_ns: int = 0,
+        concern_tags: Optional[List[List[str]]] = None,
+    ) -> None:
+        """Build the scoring data for `products`.
+
+        `concern_tags`, parallel to `products`, may be passed when the tags were
+        already extracted so lazily loaded products aren't decoded again.
+        """
+        self.products = products if isinstance(products, LazyProducts) else tuple(products)
+        self.mtime_ns = mtime_ns
+        if concern_tags is None:
+            concern_tags = [prod.get("concern_tags", ()) for prod in self.products]
+        self.tag_index: Dict[str, int] = {}
+        for tags in concern_tags:
+            for tag in tags:
+                self.tag_index.setdefault(tag, len(self.tag_index))
+        words = -(-len(self.tag_index) // 64)
+        matrix = np.zeros((len(self.products), words * 64), dtype=np.uint8)
+        for i, tags in enumerate(concern_tags):
+            for tag in tags:
+                matrix[i, self.tag_index[tag]] = 1
+        packed = np.packbits(matrix, axis=1, bitorder="little")
+        self.bits = packed.view("<u8").astype(np.uint64, copy=False)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def mask(self, tags: Iterable[str]) -> np.ndarray:
+        """Return the ``uint64`` word mask with the bit of every known tag set."""
+        words = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        for tag in tags:
+            pos = self.tag_index.get(tag)
+            if pos is not None:
+                words[pos // 64] |= np.uint64(1) << np.uint64(pos % 64)
+        return words
+
+
+def _json_loads(data: bytes) -> Any:
+    """Decode JSON bytes with orjson when available."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+# Catalogue files at least this large are memory-mapped and decoded lazily.
+LAZY_CATALOGUE_BYTES = int(os.getenv("LAZY_CATALOGUE_BYTES", str(32 * 1024 * 1024)))
+
+# JSON strings (which may contain brackets) or structural brackets
+_JSON_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[\[\]{}]', re.DOTALL)
+
+
+def _scan_item_spans(buffer: Union[bytes, mmap.mmap]) -> List[Tuple[int, int]]:
+    """Return the byte span of every object in a top-level JSON array."""
+    spans = []
+    depth = 0
+    start = 0
+    for match in _JSON_TOKEN.finditer(buffer):
+        char = buffer[match.start()]
+        if char == 0x22:  # a string; skip its contents
+            continue
+        if char in (0x5B, 0x7B):  # [ or {
+            depth += 1
+            if depth == 2:
+                start = match.start()
+        else:
+            if depth == 2:
+                spans.append((start, match.end()))
+            depth -= 1
+    return spans
+
+
+def _load_lazy_catalogue(path: str, mtime_ns: int) -> Catalogue:
+    """Memory-map a large catalogue, keeping only spans and scoring data.
+
+    Each product is decoded once to pull out its `concern_tags` and then
+    dropped; `LazyProducts` re-decodes only the records a response needs.
+    The catalogue must be updated by replacing the file (write then rename)
+    rather than rewriting it in place, since the mapping stays open.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    spans = _scan_item_spans(buffer)
+    concern_tags = [_json_loads(buffer[start:end]).get("concern_tags", ()) for start, end in spans]
+    return Catalogue(LazyProducts(buffer, spans), mtime_ns, concern_tags)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_catalogue_cached(path: str, mtime_ns: int) -> Catalogue:
+    """Parse the product catalogue once per (path, modification time).
+
+    The modification time is only part of the cache key: editing the file on
+    disk changes it and therefore forces a fresh parse on the next call.
+    """
+    # Rankings memoised against the previous catalogue would keep it alive
+    _rank_cached.cache_clear()
+    if os.path.getsize(path) >= LAZY_CATALOGUE_BYTES:
+        return _load_lazy_catalogue(path, mtime_ns)
+    if orjson is not None:
+        # orjson only accepts bytes/str, so read the raw file in binary mode
+        with open(path, "rb") as f:
+            return Catalogue(orjson.loads(f.read()), mtime_ns)
+    with open(path, "r", encoding="utf-8") as f:
+        return Catalogue(json.load(f), mtime_ns)
+
+
+def load_catalogue(path: str) -> Catalogue:
+    """Load the product catalogue and its scoring data, using the in‑memory cache.
+
+    Args:
+        path: Path to a JSON file containing a list of products.
+
+    Returns:
+        A `Catalogue`, re-parsed only when the file's modification time changes.
+    """
+    return _load_catalogue_cached(path, os.stat(path).st_mtime_ns)
+
+
 def load_products(path: str) -> List[Dict[str, Any]]:
     """Load the product catalogue from a JSON file.
 
+    The parsed catalogue is cached in memory and only re-read when the file's
+    modification time changes.
+
     Args:
         path: Path to a JSON file containing a list of products.
 
     Returns:
         A list of dictionaries describing products.
     """
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return list(load_catalogue(path).products)
+
+
+def _decode_brightness_image(file_bytes: bytes) -> Optional[np.ndarray]:
+    """Decode an image just well enough to measure its average brightness.
+
+    A single grayscale channel at 1/8 scale is enough for the heuristic, and
+    for JPEGs the downscale happens inside the DCT so the decode itself is
+    cheaper. JPEGs go through libjpeg‑turbo when PyTurboJPEG is available;
+    everything else (or anything turbo rejects) is decoded by OpenCV.
+    Non‑JPEG images smaller than 8 pixels cannot be reduced, so they are
+    decoded at full size instead.
+    """
+    if _turbojpeg is not None and file_bytes[:2] == _JPEG_MAGIC:
+        try:
+            return _turbojpeg.decode(
+                file_bytes, pixel_format=TJPF_GRAY, scaling_factor=(1, 8), flags=TJFLAG_FASTDCT
+            )
+        except (OSError, ValueError):
+            pass
+    nparr = np.frombuffer(file_bytes, np.uint8)
+    try:
+        return cv2.imdecode(nparr, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    except cv2.error:
+        return cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
 
 
 def detect_issues_from_image(file_bytes: bytes) -> List[str]:
@@ -57,35 +276,178 @@ def detect_issues_from_image(file_bytes: bytes) -> List[str]:
     Returns:
         A list of detected skin issues.
     """
-    issues = []
+    mean_intensity = None
     if cv2 is not None:
         # Attempt to decode the image. We ignore the result, but use failure as
         # a signal to return an error.
         try:
-            import numpy as np  # cv2 requires numpy to decode images
-            nparr = np.frombuffer(file_bytes, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            img = _decode_brightness_image(file_bytes)
             if img is None:
                 raise ValueError("Could not decode image")
-            # Placeholder heuristics: pick some issues based on simplistic
-            # properties of the image (mean brightness etc.). This is not
-            # medically accurate and should be replaced with real analysis.
-            mean_intensity = img.mean()
-            if mean_intensity < 100:
-                issues.append("dullness")
-            if mean_intensity > 180:
-                issues.append("oily")
+            mean_intensity = cv2.mean(img)[0]
         except Exception:
-            # If decoding fails we still return an empty list; real
+            # If decoding fails we still return the default issues; real
             # implementations should raise HTTP errors here.
             pass
-    # Always include a couple of default issues for demonstration
-    issues.extend(["dryness", "acne"])
-    # Deduplicate
-    return list(dict.fromkeys(issues))
+    return _issues_from_brightness(mean_intensity)
+
 
+def _issues_from_brightness(mean_intensity: Optional[float]) -> List[str]:
+    """Map an image's mean grayscale intensity to a list of skin issues.
+
+    Args:
+        mean_intensity: Average pixel value in [0, 255], or None if the image
+            could not be decoded.
 
-def generate_followup_questions(issues: List[str]) -> List[Question]:
+    Returns:
+        A list of detected skin issues.
+    """
+    issues = []
+    if mean_intensity is not None:
+        # Placeholder heuristics: pick some issues based on simplistic
+        # properties of the image (mean brightness etc.). This is not
+        # medically accurate and should be replaced with real analysis.
+        if mean_intensity < 100:
+            issues.append("dullness")
+        if mean_intensity > 180:
+            issues.append("oily")
+    # Always include a couple of default issues for demonstration, skipping
+    # any the heuristics above already reported
+    for default in ("dryness", "acne"):
+        if default not in issues:
+            issues.append(default)
+    return issues
+
+
+def _gpu_mean_brightness(images: List[bytes]) -> List[float]:
+    """Decode a batch of JPEGs on the GPU and return each image's mean intensity."""
+    data = [torch.frombuffer(img, dtype=torch.uint8) for img in images]
+    decoded = decode_jpeg(data, mode=ImageReadMode.GRAY, device="cuda")
+    return [float(img.float().mean()) for img in decoded]
+
+
+class GpuDecodeBatcher:
+    """Batch concurrent JPEG scans into single nvJPEG decode calls.
+
+    `/scan` requests enqueue their image and await a future. A background task
+    collects up to `max_batch` images, waiting at most `max_wait` seconds after
+    the first one arrives, decodes them together and scatters the results back.
+    A result of None means the GPU could not decode that batch; callers fall
+    back to the CPU path.
+    """
+
+    def __init__(self, max_batch: int = 16, max_wait: float = 0.005) -> None:
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "asyncio.Queue[Tuple[bytes, asyncio.Future]]" = asyncio.Queue()
+        # The batch being collected or decoded, kept here so `stop` can release it
+        self._batch: List[Tuple[bytes, asyncio.Future]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the background task and release every waiting request.
+
+        Pending futures resolve to None so their requests fall back to the CPU
+        decoding path instead of hanging.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        pending = self._batch
+        self._batch = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_result(None)
+
+    async def mean_brightness(self, file_bytes: bytes) -> Optional[float]:
+        """Queue an image for batched decoding and wait for its mean intensity."""
+        if self._task is None:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((file_bytes, future))
+        return await future
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._batch.append(await self._queue.get())
+        deadline = loop.time() + self.max_wait
+        while len(self._batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self) -> None:
+        while True:
+            await self._collect()
+            batch = self._batch
+            try:
+                means: List[Optional[float]] = await asyncio.to_thread(
+                    _gpu_mean_brightness, [img for img, _ in batch]
+                )
+            except Exception:
+                # A single corrupt JPEG fails the whole batch on the GPU
+                means = [None] * len(batch)
+            for (_, future), mean in zip(batch, means):
+                if not future.done():
+                    future.set_result(mean)
+            self._batch = []
+
+
+# Created at startup when a CUDA device is available.
+_gpu_batcher: Optional[GpuDecodeBatcher] = None
+
+
+# Example: map each issue to a specific question. Built once at import time
+# rather than on every /scan request; every entry carries all `Question`
+# fields except `id` so it can be returned without model validation.
+_QUESTION_MAPPING: Dict[str, Dict[str, Any]] = {
+    "dryness": {
+        "text": "On a scale of 1–5, how dry does your skin feel?",
+        "type": "number",
+        "options": None,
+    },
+    "acne": {
+        "text": "Are your breakouts occasional or frequent?",
+        "type": "select",
+        "options": ["Occasional", "Frequent", "Severe"],
+    },
+    "redness": {
+        "text": "Do you experience redness throughout the day?",
+        "type": "select",
+        "options": ["Yes", "No"],
+    },
+    "dullness": {
+        "text": "Would you describe your complexion as dull?",
+        "type": "select",
+        "options": ["Yes", "No"],
+    },
+    "oily": {
+        "text": "How oily does your skin get during the day?",
+        "type": "select",
+        "options": ["Slightly", "Moderately", "Very"],
+    },
+}
+
+# If the OpenAI API key is set and the module is available, you may use an LLM
+# to generate follow‑up questions. This is purely illustrative and should be
+# replaced with your own logic when using an actual LLM.
+_USE_LLM = bool(os.getenv("OPENAI_API_KEY")) and openai is not None
+
+
+def generate_followup_questions(issues: List[str]) -> List[Dict[str, Any]]:
     """Generate a tailored follow‑up questionnaire.
 
     A simple rule‑based system creates questions based on the detected issues.
@@ -97,91 +459,185 @@ def generate_followup_questions(issues: List[str]) -> List[Question]:
         issues: List of strings describing detected skin issues.
 
     Returns:
-        A list of `Question` objects.
-    """
-    questions: List[Question] = []
-    # Example: map each issue to a specific question
-    mapping = {
-        "dryness": {
-            "text": "On a scale of 1–5, how dry does your skin feel?",
-            "type": "number",
-        },
-        "acne": {
-            "text": "Are your breakouts occasional or frequent?",
-            "type": "select",
-            "options": ["Occasional", "Frequent", "Severe"],
-        },
-        "redness": {
-            "text": "Do you experience redness throughout the day?",
-            "type": "select",
-            "options": ["Yes", "No"],
-        },
-        "dullness": {
-            "text": "Would you describe your complexion as dull?",
-            "type": "select",
-            "options": ["Yes", "No"],
-        },
-        "oily": {
-            "text": "How oily does your skin get during the day?",
-            "type": "select",
-            "options": ["Slightly", "Moderately", "Very"],
-        },
-    }
-    # If the OpenAI API key is set and the module is available, you may use
-    # an LLM to generate follow‑up questions. This is purely illustrative and
-    # should be replaced with your own logic when using an actual LLM.
-    use_llm = False
-    api_key = os.getenv("OPENAI_API_KEY")
-    if api_key and openai is not None:
-        use_llm = True
-    # In this scaffold we stick with rule‑based logic.
-    for issue in issues:
-        if issue in mapping:
-            meta = mapping[issue]
-            questions.append(
-                Question(
-                    id=issue,
-                    text=meta["text"],
-                    type=meta.get("type", "text"),
-                    options=meta.get("options"),
-                )
-            )
-    return questions
+        A list of dictionaries shaped like the `Question` schema.
+    """
+    # In this scaffold we stick with rule‑based logic. The questions are
+    # trusted internal data, so plain dicts are returned rather than paying
+    # for `Question` validation only to serialise it straight back out.
+    return [{"id": issue, **_QUESTION_MAPPING[issue]} for issue in issues if issue in _QUESTION_MAPPING]
+
+
+# The dryness question is asked on a 1–5 scale
+DRYNESS_SCALE = (1, 5)
+
 
+def _dryness_bonus(answers: Dict[str, Any]) -> int:
+    """Return the extra weight for dryness‑tagged products from the quiz answers.
 
-def recommend_products(issues: List[str], answers: Dict[str, Any], products: List[Dict[str, Any]], top_n: int = 5) -> List[Dict[str, Any]]:
+    The answer is client controlled: values below `DRYNESS_SCALE` give no bonus
+    and larger ones are capped at its top so scores stay small integers.
+    """
+    dryness_level = answers.get("dryness")
+    if not dryness_level:
+        return 0
+    try:
+        level = int(dryness_level)
+    except (ValueError, TypeError, OverflowError):
+        return 0
+    low, high = DRYNESS_SCALE
+    if level < low:
+        return 0
+    return min(level, high)
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _popcount64(x):
+        """Count set bits; LLVM lowers this SWAR sequence to a popcnt instruction."""
+        x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+        x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+        x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+        return (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+    # Serial on purpose: catalogues are small enough that thread-pool dispatch
+    # costs more than the scoring, and Numba's TBB threading layer can hang
+    # process exit when the kernel is called from a worker thread.
+    @njit(cache=True)
+    def _score_kernel(bits, query, dryness_word, dryness_mask, dryness_bonus):
+        """Score every packed product row against the query, fusing in the dryness bonus."""
+        n, w = bits.shape
+        out = np.zeros(n, np.int32)
+        for i in range(n):
+            score = 0
+            for j in range(w):
+                score += np.int64(_popcount64(bits[i, j] & query[j]))
+            if dryness_word >= 0 and bits[i, dryness_word] & dryness_mask:
+                score += dryness_bonus  # weight dryness by severity
+            out[i] = score
+        return out
+else:
+    _score_kernel = None
+
+
+def _score_numpy(bits: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Count the bits each packed row shares with the query."""
+    shared = bits & query
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(shared).sum(axis=1, dtype=np.int32)
+    return np.unpackbits(shared.view(np.uint8), axis=1).sum(axis=1, dtype=np.int32)
+
+
+def _warm_score_kernel() -> None:
+    """Compile the Numba scoring kernel ahead of the first request."""
+    if _score_kernel is not None:
+        _score_kernel(np.zeros((1, 1), dtype=np.uint64), np.zeros(1, dtype=np.uint64), 0, np.uint64(1), 0)
+
+
+def _top_indices(scores: np.ndarray, top_n: int) -> np.ndarray:
+    """Return the indices of the `top_n` largest scores, ties in index order.
+
+    Uses a linear‑time partition instead of a full sort; products tied at the
+    cut‑off score are taken in catalogue order so results stay deterministic.
+    """
+    n = len(scores)
+    if top_n <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if top_n < n:
+        kth = np.partition(scores, n - top_n)[n - top_n]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[: top_n - len(above)]
+        top = np.concatenate((above, ties))
+    else:
+        top = np.arange(n)
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def _rank(catalogue: Catalogue, issue_set: FrozenSet[str], dryness_bonus: int, top_n: int) -> Tuple[int, ...]:
+    """Return the catalogue indices of the `top_n` best matching products."""
+    query = catalogue.mask(issue_set)
+    dryness_pos = catalogue.tag_index.get("dryness", -1)
+    dryness_word = dryness_pos // 64 if dryness_pos >= 0 else -1
+    dryness_mask = np.uint64(1) << np.uint64(dryness_pos % 64)
+    if _score_kernel is not None:
+        scores = _score_kernel(catalogue.bits, query, dryness_word, dryness_mask, dryness_bonus)
+    else:
+        scores = _score_numpy(catalogue.bits, query)
+        if dryness_word >= 0 and dryness_bonus:
+            has_dryness = (catalogue.bits[:, dryness_word] & dryness_mask) != 0
+            scores += dryness_bonus * has_dryness.astype(np.int32)  # weight dryness by severity
+    return tuple(_top_indices(scores, top_n).tolist())
+
+
+# Many users share the same handful of issues, so rankings against a cached
+# catalogue are memoised. Catalogues hash by identity and a new one is built
+# whenever products.json changes, so stale rankings are never returned; the
+# memo is cleared on every catalogue load so it never outlives the loader cache.
+_rank_cached = functools.lru_cache(maxsize=256)(_rank)
+
+
+def recommend_products(
+    issues: List[str],
+    answers: Dict[str, Any],
+    products: Union[Catalogue, List[Dict[str, Any]]],
+    top_n: int = 5,
+) -> List[Dict[str, Any]]:
     """Recommend products based on issues and answers.
 
     The matching algorithm assigns a simple score to each product: it adds one
     point for every overlap between the product's `concern_tags` and the
     detected issues. Additional heuristics could use the answers to weight
-    matches. Products are then sorted by score descending and truncated.
+    matches. The `top_n` highest scoring products are returned, ties keeping
+    catalogue order. Rankings against a `Catalogue` are memoised.
 
     Args:
         issues: List of detected skin issues.
         answers: A mapping of question identifiers to user responses.
-        products: List of available products.
+        products: A `Catalogue` or a plain list of available products.
         top_n: Number of products to return.
 
     Returns:
         A list of up to `top_n` product dictionaries sorted by relevance.
     """
-    def score_product(prod: Dict[str, Any]) -> int:
-        score = 0
-        for tag in prod.get("concern_tags", []):
-            if tag in issues:
-                score += 1
-        # Example: adjust score based on dryness level if provided
-        dryness_level = answers.get("dryness")
-        if dryness_level and "dryness" in prod.get("concern_tags", []):
-            try:
-                lvl = int(dryness_level)
-                score += lvl  # weight dryness by severity
-            except (ValueError, TypeError):
-                pass
-        return score
-    scored = sorted(products, key=score_product, reverse=True)
-    return scored[:top_n]
+    issue_set = frozenset(issues)
+    # Example: adjust score based on dryness level if provided
+    dryness_bonus = _dryness_bonus(answers)
+    if isinstance(products, Catalogue):
+        catalogue = products
+        top = _rank_cached(catalogue, issue_set, dryness_bonus, top_n)
+    else:
+        catalogue = Catalogue(products)
+        top = _rank(catalogue, issue_set, dryness_bonus, top_n)
+    return [catalogue.products[i] for i in top]
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, falling back to the stdlib encoder."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def recommendation_etag(issues: List[str], answers: Dict[str, Any], path: str, mtime_ns: int) -> str:
+    """Build a quoted ETag identifying a /recommend result.
+
+    The tag covers the (order‑insensitive) request body and the catalogue file
+    and version it was ranked against, so it changes whenever the response would.
+    """
+    key = [sorted(issues), answers, path, mtime_ns]
+    # The stdlib encoder is used deliberately: unlike orjson it accepts integers
+    # beyond 64 bits, which are valid JSON a client may send in any answer.
+    raw = json.dumps(key, sort_keys=True, default=str).encode("utf-8")
+    return '"' + hashlib.blake2b(raw, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Return True if an If-None-Match header value matches `etag`."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
 
 
 def get_products_path() -> str:
@@ -189,12 +645,63 @@ def get_products_path() -> str:
     return os.getenv("PRODUCT_FILE_PATH", os.path.join(os.path.dirname(__file__), "data", "products.json"))
 
 
-app = FastAPI(title="Skincare Agent API")
+# Uploads larger than this are rejected with 413 before they are fully read.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
 
-# Mount the frontend static assets. The React app builds into `frontend/public`.
-frontend_path = os.path.join(os.path.dirname(__file__), "..", "frontend", "public")
-if os.path.isdir(frontend_path):
-    app.mount("/", StaticFiles(directory=frontend_path, html=True), name="frontend")
+
+async def read_upload(file: UploadFile) -> bytearray:
+    """Read an uploaded file in chunks, enforcing `MAX_UPLOAD_BYTES`.
+
+    Starlette already spools large uploads to a temporary file; reading it back
+    in fixed-size chunks lets oversized images be rejected as soon as the limit
+    is crossed instead of after the whole body has been buffered.
+
+    Args:
+        file: The uploaded file.
+
+    Returns:
+        The file contents.
+
+    Raises:
+        HTTPException: 413 if the upload exceeds `MAX_UPLOAD_BYTES`.
+    """
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+    buffer = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        if len(buffer) + len(chunk) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+        buffer += chunk
+    return buffer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Pre-warm the product catalogue cache so the first request isn't penalised.
+
+    Also compiles the Numba scoring kernel, if Numba is installed, and starts
+    the batched GPU JPEG decoder when a CUDA device is available.
+    """
+    global _gpu_batcher
+    try:
+        load_catalogue(get_products_path())
+    except OSError:
+        # A missing catalogue is reported by /recommend itself.
+        pass
+    _warm_score_kernel()
+    if cv2 is not None and torch is not None and torch.cuda.is_available():
+        _gpu_batcher = GpuDecodeBatcher()
+        _gpu_batcher.start()
+    try:
+        yield
+    finally:
+        if _gpu_batcher is not None:
+            await _gpu_batcher.stop()
+            _gpu_batcher = None
+
+
+app = FastAPI(title="Skincare Agent API", lifespan=lifespan)
 
 
 @app.get("/quiz/start", summary="Start the initial skin‑concern questionnaire")
@@ -203,24 +710,75 @@ async def quiz_start() -> Dict[str, str]:
     return {"question": "What’s your main skin issue today?"}
 
 
-@app.post("/scan", response_model=ScanResult, summary="Process an uploaded face image and generate follow‑up questions")
-async def scan(file: UploadFile = File(...)) -> ScanResult:
+@app.post(
+    "/scan",
+    response_model=ScanResult,
+    response_class=ORJSONResponse,
+    summary="Process an uploaded face image and generate follow‑up questions",
+)
+async def scan(file: UploadFile = File(...)) -> ORJSONResponse:
     """Accept a face photo, detect issues and return a tailored questionnaire."""
-    file_bytes = await file.read()
+    file_bytes = await read_upload(file)
     if not file_bytes:
         raise HTTPException(status_code=400, detail="No file uploaded")
-    issues = detect_issues_from_image(file_bytes)
+    issues = None
+    if _gpu_batcher is not None and file_bytes[:2] == _JPEG_MAGIC:
+        mean_intensity = await _gpu_batcher.mean_brightness(file_bytes)
+        if mean_intensity is not None:
+            issues = _issues_from_brightness(mean_intensity)
+    if issues is None:
+        # Decoding is CPU bound; run it off the event loop so other requests proceed
+        issues = await asyncio.to_thread(detect_issues_from_image, file_bytes)
     questions = generate_followup_questions(issues)
-    return ScanResult(issues=issues, questions=questions)
-
-
-@app.post("/recommend", summary="Recommend skincare products based on scan and answers")
-async def recommend(body: RecommendRequest = Body(...)) -> List[Dict[str, Any]]:
-    """Return the top matching products given detected issues and user answers."""
+    # `response_model` documents the schema; the body is built from internal
+    # data, so it is returned directly without re-validation.
+    return ORJSONResponse({"issues": issues, "questions": questions})
+
+
+@app.post(
+    "/recommend",
+    response_model=List[Dict[str, Any]],
+    response_class=ORJSONResponse,
+    summary="Recommend skincare products based on scan and answers",
+)
+async def recommend(request: Request, body: RecommendRequest = Body(...)) -> Response:
+    """Return the top matching products given detected issues and user answers.
+
+    Responses carry an ETag; a client repeating the same request against an
+    unchanged catalogue gets an empty 304 instead of a fresh ranking. Strictly,
+    RFC 9110 only defines 304 for GET/HEAD, so browsers and proxies never
+    revalidate this POST themselves; the shortcut serves API clients that
+    store the ETag and send it back in If-None-Match explicitly.
+    """
     products_path = get_products_path()
     try:
-        products = load_products(products_path)
+        # A cache miss parses the whole file (seconds for a very large,
+        # lazily mapped catalogue), so keep it off the event loop
+        catalogue = await asyncio.to_thread(load_catalogue, products_path)
     except FileNotFoundError:
         raise HTTPException(status_code=500, detail=f"Products file not found at {products_path}")
-    recommended = recommend_products(body.issues, body.answers, products)
-    return recommended
+    etag = recommendation_etag(body.issues, body.answers, products_path, catalogue.mtime_ns)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=60"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    recommended = recommend_products(body.issues, body.answers, catalogue)
+    # Products come straight from our own catalogue, so return a response
+    # directly and skip FastAPI's validation and jsonable_encoder pass.
+    return ORJSONResponse(recommended, headers=headers)
+
+
+# Mount the frontend static assets. The React app builds into `frontend/public`.
+# The mount is registered after the API routes so it never shadows them. Set
+# SERVE_FRONTEND=0 when a reverse proxy (nginx, Caddy) serves `frontend/public`
+# directly, keeping static traffic off the Python event loop entirely.
+frontend_path = os.path.join(os.path.dirname(__file__), "..", "frontend", "public")
+if os.getenv("SERVE_FRONTEND", "1") != "0" and os.path.isdir(frontend_path):
+    app.mount("/", StaticFiles(directory=frontend_path, html=True), name="frontend")
+
+
+if __name__ == "__main__":
+    # Local development entrypoint: `python -m backend.main`. Uses uvloop and
+    # the httptools parser when installed, like the Docker image does.
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="auto", http="auto")
@@ -55,3 +55,226 @@ def test_recommend_endpoint_returns_products():
     # Should return up to 5 products
     assert isinstance(data, list)
     assert 0 <= len(data) <= 5
+
+
+def test_load_products_reloads_when_file_changes(tmp_path):
+    import os
+    from backend.main import load_products
+
+    path = tmp_path / "products.json"
+    path.write_text('[{"id": 1, "concern_tags": ["acne"]}]', encoding="utf-8")
+    assert [p["id"] for p in load_products(str(path))] == [1]
+
+    path.write_text('[{"id": 2, "concern_tags": ["dryness"]}]', encoding="utf-8")
+    # Bump the mtime explicitly so the test doesn't depend on timer resolution
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert [p["id"] for p in load_products(str(path))] == [2]
+
+
+def test_recommend_products_ranks_by_overlap_and_dryness():
+    from backend.main import recommend_products
+
+    products = [
+        {"id": 1, "concern_tags": ["redness"]},
+        {"id": 2, "concern_tags": ["acne", "oily"]},
+        {"id": 3, "concern_tags": ["dryness"]},
+        {"id": 4, "concern_tags": ["acne"]},
+    ]
+    ranked = recommend_products(["acne", "oily"], {"dryness": "5"}, products, top_n=3)
+    assert [p["id"] for p in ranked] == [3, 2, 4]
+    # Ties keep catalogue order
+    ranked = recommend_products(["acne"], {}, products, top_n=2)
+    assert [p["id"] for p in ranked] == [2, 4]
+
+
+def test_recommend_products_bounds_dryness_answer():
+    from backend.main import recommend_products
+
+    products = [
+        {"id": 1, "concern_tags": ["acne", "oily"]},
+        {"id": 2, "concern_tags": ["dryness"]},
+    ]
+    # Oversized answers are capped at the top of the 1–5 scale
+    for level in ("99999999999999999999", 3000000000):
+        ranked = recommend_products(["acne", "oily"], {"dryness": level}, products)
+        assert [p["id"] for p in ranked] == [2, 1]
+    # Zero and negative answers give no bonus
+    for level in ("0", 0, "-1", "-99999999999999999999"):
+        ranked = recommend_products(["acne", "oily"], {"dryness": level}, products)
+        assert [p["id"] for p in ranked] == [1, 2]
+
+
+def test_rank_cache_is_cleared_when_catalogue_reloads(tmp_path):
+    import os
+
+    import backend.main as main
+
+    path = tmp_path / "products.json"
+    path.write_text('[{"id": 1, "concern_tags": ["acne"]}]', encoding="utf-8")
+    main.recommend_products(["acne"], {}, main.load_catalogue(str(path)))
+    assert main._rank_cached.cache_info().currsize >= 1
+
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    main.load_catalogue(str(path))
+    assert main._rank_cached.cache_info().currsize == 0
+
+
+def test_read_upload_rejects_oversized_files(monkeypatch):
+    import asyncio
+
+    import pytest
+    from fastapi import HTTPException, UploadFile
+
+    import backend.main as main
+
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 100)
+    monkeypatch.setattr(main, "UPLOAD_CHUNK_SIZE", 16)
+    small = UploadFile(io.BytesIO(b"x" * 100))
+    assert asyncio.run(main.read_upload(small)) == b"x" * 100
+    large = UploadFile(io.BytesIO(b"x" * 101))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(main.read_upload(large))
+    assert exc.value.status_code == 413
+
+
+def test_gpu_decode_batcher_groups_concurrent_requests(monkeypatch):
+    import asyncio
+
+    import backend.main as main
+
+    batches = []
+
+    def fake_decode(images):
+        batches.append(len(images))
+        if b"bad" in images:
+            raise RuntimeError("corrupt JPEG")
+        return [float(len(img)) for img in images]
+
+    monkeypatch.setattr(main, "_gpu_mean_brightness", fake_decode)
+
+    async def run():
+        batcher = main.GpuDecodeBatcher(max_batch=4, max_wait=0.05)
+        batcher.start()
+        try:
+            first = await asyncio.gather(*(batcher.mean_brightness(b"x" * n) for n in range(1, 6)))
+            second = await batcher.mean_brightness(b"bad")
+        finally:
+            await batcher.stop()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert second is None
+    assert batches == [4, 1, 1]
+
+
+def test_gpu_decode_batcher_stop_releases_waiting_requests(monkeypatch):
+    import asyncio
+    import threading
+
+    import backend.main as main
+
+    release = threading.Event()
+
+    def slow_decode(images):
+        release.wait(5)
+        return [1.0] * len(images)
+
+    monkeypatch.setattr(main, "_gpu_mean_brightness", slow_decode)
+
+    async def run():
+        batcher = main.GpuDecodeBatcher(max_batch=2, max_wait=0.01)
+        batcher.start()
+        # Two requests fill the batch being decoded, two more wait in the queue
+        waiting = [asyncio.create_task(batcher.mean_brightness(b"img")) for _ in range(4)]
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        results = await asyncio.wait_for(asyncio.gather(*waiting), timeout=1)
+        late = await batcher.mean_brightness(b"img")
+        release.set()
+        return results, late
+
+    results, late = asyncio.run(run())
+    assert results == [None, None, None, None]
+    assert late is None
+
+
+def test_numba_score_kernel_matches_numpy_scoring():
+    import pytest
+
+    pytest.importorskip("numba")
+    import numpy as np
+
+    import backend.main as main
+
+    products = [{"id": i, "concern_tags": [f"t{(i * j) % 90}" for j in range(i % 7)] + ["dryness"] * (i % 2)}
+                for i in range(40)]
+    catalogue = main.Catalogue(products)
+    query = catalogue.mask(["t0", "t3", "t64", "t89", "dryness"])
+    pos = catalogue.tag_index["dryness"]
+    dryness_mask = np.uint64(1) << np.uint64(pos % 64)
+    expected = main._score_numpy(catalogue.bits, query)
+    expected += 4 * ((catalogue.bits[:, pos // 64] & dryness_mask) != 0).astype(np.int32)
+    scores = main._score_kernel(catalogue.bits, query, pos // 64, dryness_mask, 4)
+    assert scores.tolist() == expected.tolist()
+
+
+def test_recommend_returns_304_for_matching_etag():
+    payload = {"issues": ["acne", "dryness"], "answers": {"dryness": "3"}}
+    first = client.post("/recommend", json=payload)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    # Issue order doesn't change the result, so it doesn't change the ETag
+    reordered = {"issues": ["dryness", "acne"], "answers": {"dryness": "3"}}
+    repeat = client.post("/recommend", json=reordered, headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.headers["etag"] == etag
+    assert repeat.content == b""
+
+    changed = {"issues": ["acne"], "answers": {"dryness": "3"}}
+    response = client.post("/recommend", json=changed, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_recommend_etag_accepts_integers_beyond_64_bits():
+    # Valid JSON that orjson cannot encode must not break ETag generation
+    payload = {"issues": ["dryness"], "answers": {"x": 99999999999999999999}}
+    first = client.post("/recommend", json=payload)
+    assert first.status_code == 200
+    repeat = client.post("/recommend", json=payload, headers={"If-None-Match": first.headers["etag"]})
+    assert repeat.status_code == 304
+
+
+def test_followup_questions_match_question_schema():
+    from backend.main import generate_followup_questions
+    from backend.schemas import Question
+
+    questions = generate_followup_questions(["dryness", "acne", "unknown"])
+    assert [q["id"] for q in questions] == ["dryness", "acne"]
+    # The plain dicts must serialise exactly like validated `Question` models
+    assert questions == [Question(**q).model_dump() for q in questions]
+
+
+def test_large_catalogue_is_loaded_lazily(tmp_path, monkeypatch):
+    import json
+
+    import backend.main as main
+
+    products = [
+        {"id": 1, "name": "Cream [rich] {\"gold\"}", "concern_tags": ["dryness"]},
+        {"id": 2, "name": "Serum", "concern_tags": ["acne", "oily"], "extra": {"nested": [1, 2]}},
+        {"id": 3, "name": "Toner"},
+    ]
+    path = tmp_path / "products.json"
+    path.write_text(json.dumps(products, indent=2), encoding="utf-8")
+    monkeypatch.setattr(main, "LAZY_CATALOGUE_BYTES", 0)
+
+    catalogue = main.load_catalogue(str(path))
+    assert isinstance(catalogue.products, main.LazyProducts)
+    assert main.load_products(str(path)) == products
+    ranked = main.recommend_products(["acne"], {"dryness": "2"}, catalogue, top_n=2)
+    assert [p["id"] for p in ranked] == [1, 2]